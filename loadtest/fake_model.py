@@ -0,0 +1,84 @@
+"""
+Local stand-in for the upstream Gemini generateContent endpoint, with
+tunable latency and error rate, for load testing the build-resume endpoint.
+
+Usage:
+    python -m loadtest.fake_model --port 8001 --latency-ms 800 --jitter-ms 200 --error-rate 0.02
+    RESUME_BUILDER_MODEL_URL=http://127.0.0.1:8001/generate python manage.py runserver
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency_ms, jitter_ms, error_rate):
+    class FakeModelHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            delay = max(random.gauss(latency_ms, jitter_ms), 0) / 1000.0
+            time.sleep(delay)
+
+            if random.random() < error_rate:
+                self.send_json(random.choice([500, 503]), {
+                    "error": {"code": 503, "message": "Injected upstream failure", "status": "UNAVAILABLE"}
+                })
+                return
+
+            try:
+                prompt = body["contents"][0]["parts"][0]["text"]
+            except (KeyError, IndexError, TypeError):
+                prompt = ""
+            self.send_json(200, {
+                "candidates": [{
+                    "content": {
+                        "parts": [{"text": f"Generated resume for: {prompt[-200:]}"}],
+                        "role": "model",
+                    },
+                    "finishReason": "STOP",
+                }],
+                "usageMetadata": {"promptTokenCount": len(prompt.split())},
+            })
+
+        def send_json(self, status_code, data):
+            payload = json.dumps(data).encode("utf-8")
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # Keep the console quiet under load
+            pass
+
+    return FakeModelHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake upstream model server for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=500, help="Mean response latency.")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Standard deviation of the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0-1).")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port),
+        make_handler(args.latency_ms, args.jitter_ms, args.error_rate),
+    )
+    print(f"Fake model listening on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Load-test harness for the scoring and build endpoints.
+
+Replays a weighted mix of /api/resume-score/ and /api/build-resume/ requests
+against a running server (runserver, gunicorn or uvicorn) at increasing
+concurrency levels, and reports throughput, p50/p95/p99 latency and error
+rate for each level.
+
+Usage:
+    python -m loadtest.fake_model --port 8001 &
+    RESUME_BUILDER_MODEL_URL=http://127.0.0.1:8001/generate gunicorn resume_builder_api.wsgi -w 4 &
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --mix score=0.8,build=0.2 --concurrency 1,4,16,64
+
+For a release check, save a run with --output and compare later runs to it:
+    python -m loadtest.run --output baseline.json
+    python -m loadtest.run --baseline baseline.json --max-regression 0.1
+which exits with status 1 when throughput at any concurrency level present
+in both runs dropped by more than the allowed fraction.
+
+The per-client rate limit counts all workers as one client unless they send
+API keys listed in RESUME_API_KEYS (pass them with --api-keys, they are
+handed out to workers round-robin); raise RESUME_RATE_LIMIT in settings (or
+set its rate to 0) when measuring raw capacity. 429 and 503 responses are
+counted as shed load.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+
+DEFAULT_RESUME = Path(__file__).resolve().parent.parent / "resume" / "resume.pdf"
+
+BUILD_INFO = (
+    "My name is Alex Doe. I have 4 years of experience as a backend developer "
+    "working with Python, Django, PostgreSQL and AWS. I studied computer science "
+    "at a state university and led a team of three engineers."
+)
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        if name not in ("score", "build"):
+            raise argparse.ArgumentTypeError(f"Unknown request type: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def send_request(session, base_url, kind, resume_bytes, timeout):
+    if kind == "score":
+        return session.post(
+            f"{base_url}/api/resume-score/",
+            files={"resume": ("resume.pdf", resume_bytes, "application/pdf")},
+            data={"job_title": "Software Engineer"},
+            timeout=timeout,
+        )
+    return session.post(
+        f"{base_url}/api/build-resume/",
+        json={"info": BUILD_INFO},
+        timeout=timeout,
+    )
+
+
+def run_level(args, concurrency, resume_bytes):
+    """
+    Run `concurrency` closed-loop workers for `args.duration` seconds and
+    return the per-request samples as (kind, latency, outcome) tuples, with
+    the wall time the level took. Requests still running at the deadline
+    are allowed to finish, so the wall time can exceed `args.duration`.
+    """
+    samples = []
+    samples_lock = threading.Lock()
+    kinds = list(args.mix)
+    weights = [args.mix[kind] for kind in kinds]
+    deadline = time.monotonic() + args.duration
+
+    def worker(worker_id):
+        session = requests.Session()
+        if args.api_keys:
+            session.headers["X-Api-Key"] = args.api_keys[worker_id % len(args.api_keys)]
+        local = []
+        while time.monotonic() < deadline:
+            kind = random.choices(kinds, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = send_request(session, args.base_url, kind, resume_bytes, args.timeout)
+                if response.status_code in (429, 503):
+                    outcome = "shed"
+                elif response.ok:
+                    outcome = "ok"
+                else:
+                    outcome = "error"
+            except requests.RequestException:
+                outcome = "error"
+            local.append((kind, time.perf_counter() - started, outcome))
+        with samples_lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.monotonic() - started
+
+
+def summarise(concurrency, wall_time, samples):
+    latencies = [latency for _, latency, outcome in samples if outcome == "ok"]
+    total = len(samples)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "wall_time_s": wall_time,
+        "throughput": len(latencies) / wall_time,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "error_rate": sum(1 for _, _, outcome in samples if outcome == "error") / total if total else 0.0,
+        "shed_rate": sum(1 for _, _, outcome in samples if outcome == "shed") / total if total else 0.0,
+        "by_kind": {
+            kind: sum(1 for sample_kind, _, _ in samples if sample_kind == kind)
+            for kind in sorted({sample_kind for sample_kind, _, _ in samples})
+        },
+    }
+
+
+def find_regressions(results, baseline, max_regression):
+    """
+    Compare throughput level by level against a baseline run and return a
+    description of every level that dropped by more than `max_regression`.
+    """
+    baseline_by_level = {result["concurrency"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_level.get(result["concurrency"])
+        if previous is None or previous["throughput"] <= 0:
+            continue
+        change = result["throughput"] / previous["throughput"] - 1
+        if change < -max_regression:
+            regressions.append(
+                f"concurrency {result['concurrency']}: {result['throughput']:.1f} rps "
+                f"vs {previous['throughput']:.1f} rps in baseline ({change:+.1%})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the resume scoring and build endpoints.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--resume", type=Path, default=DEFAULT_RESUME, help="PDF uploaded to the scoring endpoint.")
+    parser.add_argument("--mix", type=parse_mix, default="score=0.8,build=0.2",
+                        help="Weighted request mix, e.g. score=0.8,build=0.2.")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated concurrency levels.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run each concurrency level.")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds.")
+    parser.add_argument("--api-keys", type=lambda value: value.split(","), default=[],
+                        help="Comma-separated API keys from RESUME_API_KEYS to send as X-Api-Key.")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", type=Path, help="Results JSON of an earlier run to compare throughput against.")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="Allowed throughput drop against --baseline, as a fraction.")
+    args = parser.parse_args()
+
+    resume_bytes = args.resume.read_bytes()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    print(f"{'conc':>5} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'shed':>7}")
+    results = []
+    for concurrency in levels:
+        samples, wall_time = run_level(args, concurrency, resume_bytes)
+        result = summarise(concurrency, wall_time, samples)
+        results.append(result)
+        print(
+            f"{result['concurrency']:>5} {result['requests']:>7} {result['throughput']:>8.1f} "
+            f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['p99_ms']:>8.0f} "
+            f"{result['error_rate']:>7.1%} {result['shed_rate']:>7.1%}"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = find_regressions(results, json.loads(args.baseline.read_text()), args.max_regression)
+        if regressions:
+            print("\nThroughput regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo throughput regression beyond {args.max_regression:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
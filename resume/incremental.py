@@ -0,0 +1,162 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[settings.RESUME_INCREMENTAL["cache"]]
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def scoring_signature(rules, job_specific_keywords):
+    """
+    Identify the scoring rules and job keywords that section hits were
+    computed with, so a deploy that changes any rule list (or a different
+    job) never reuses stale hits.
+    """
+    return _hash(json.dumps([rules, job_specific_keywords], sort_keys=True))
+
+
+def split_sections(resume_text, section_headers):
+    """
+    Split resume text into sections at lines that are a known section header.
+    Text before the first header forms a "header" section (name, contact
+    details). Returns (title, text, content hash) tuples; the section texts
+    concatenate back to the original resume text.
+    """
+    sections = []
+    title, lines = "header", []
+    for line in resume_text.splitlines(keepends=True):
+        heading = line.strip().lower().rstrip(":").strip()
+        if heading in section_headers:
+            if lines:
+                sections.append((title, "".join(lines)))
+            title, lines = heading, []
+        lines.append(line)
+    if lines:
+        sections.append((title, "".join(lines)))
+
+    # Keep titles unique so sections can be matched between versions
+    seen = {}
+    result = []
+    for title, text in sections:
+        seen[title] = seen.get(title, 0) + 1
+        if seen[title] > 1:
+            title = f"{title} #{seen[title]}"
+        result.append((title, text, _hash(text)))
+    return result
+
+
+def get_section_hits(text, section_hash, signature, count_hits):
+    """
+    Return the hits of a section, only running count_hits when the same
+    section content has not been matched under the same scoring signature.
+    """
+    cache = _cache()
+    key = f"resume-hits:{section_hash}:{signature}"
+    hits = cache.get(key)
+    if hits is None:
+        hits = count_hits(text)
+        cache.set(key, hits, timeout=settings.RESUME_INCREMENTAL["timeout"])
+    return hits
+
+
+def merge_hits(hits_list):
+    """
+    Combine the hits of several sections into the hits of the whole text.
+    """
+    merged = {
+        "keyword_counts": {},
+        "terms": set(),
+        "years": [],
+        "headers": set(),
+        "contacts": set(),
+        "word_count": 0,
+    }
+    for hits in hits_list:
+        for keyword, count in hits["keyword_counts"].items():
+            merged["keyword_counts"][keyword] = merged["keyword_counts"].get(keyword, 0) + count
+        merged["terms"] |= hits["terms"]
+        merged["years"] += hits["years"]
+        merged["headers"] |= hits["headers"]
+        merged["contacts"] |= hits["contacts"]
+        merged["word_count"] += hits["word_count"]
+    return merged
+
+
+def save_version(sections, result, signature):
+    """
+    Store the sections and score of a submission and return its version id,
+    which the client can send back as `previous_version` on resubmission.
+    """
+    version = _hash(signature + "".join(section_hash for _, section_hash, _ in sections))
+    _cache().set(f"resume-version:{version}", {
+        "signature": signature,
+        "sections": sections,
+        "total_score": result["total_score"],
+        "breakdown": result["breakdown"],
+        "feedback": result["feedback"],
+    }, timeout=settings.RESUME_INCREMENTAL["timeout"])
+    return version
+
+
+def load_version(version):
+    return _cache().get(f"resume-version:{version}")
+
+
+def _breakdown_delta(before, after):
+    return {category: after[category] - before[category] for category in after}
+
+
+def diff_versions(previous, sections, result, signature, score_hits):
+    """
+    Describe how the score moved since a previous version: the overall and
+    per-category deltas, feedback lines added or removed, and for each
+    added, removed or modified section the score change it causes on its
+    own when applied to the previous version.
+    """
+    changes = {
+        "score_delta": result["total_score"] - previous["total_score"],
+        "breakdown_delta": _breakdown_delta(previous["breakdown"], result["breakdown"]),
+        "feedback_added": [line for line in result["feedback"] if line not in previous["feedback"]],
+        "feedback_removed": [line for line in previous["feedback"] if line not in result["feedback"]],
+        "sections": [],
+    }
+
+    previous_sections = {title: (section_hash, hits) for title, section_hash, hits in previous["sections"]}
+    current_sections = {title: (section_hash, hits) for title, section_hash, hits in sections}
+    # Section hits depend on the rules and job keywords, so attribution is
+    # only meaningful when both versions were scored the same way
+    comparable = previous["signature"] == signature
+    if comparable:
+        baseline = score_hits(merge_hits([hits for _, hits in previous_sections.values()]))
+
+    titles = list(current_sections) + [title for title in previous_sections if title not in current_sections]
+    for title in titles:
+        if title not in previous_sections:
+            section_status = "added"
+        elif title not in current_sections:
+            section_status = "removed"
+        elif previous_sections[title][0] != current_sections[title][0]:
+            section_status = "modified"
+        else:
+            continue
+
+        entry = {"section": title, "status": section_status}
+        if comparable:
+            swapped = {name: hits for name, (_, hits) in previous_sections.items()}
+            if title in current_sections:
+                swapped[title] = current_sections[title][1]
+            else:
+                del swapped[title]
+            scored = score_hits(merge_hits(list(swapped.values())))
+            entry["score_delta"] = scored["total_score"] - baseline["total_score"]
+            entry["breakdown_delta"] = _breakdown_delta(baseline["breakdown"], scored["breakdown"])
+        changes["sections"].append(entry)
+
+    return changes
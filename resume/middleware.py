@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import zstandard # type: ignore
+except ImportError:  # zstd is only offered when zstandard is installed
+    zstandard = None
+
+
+def parse_accept_encoding(header):
+    """
+    Return {coding: q-value} for an Accept-Encoding header.
+    """
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Compresses API response bodies larger than RESUME_COMPRESSION['min_size'],
+    preferring zstd over gzip unless the client weighs gzip higher. Encodings
+    the client sends with q=0 are never used.
+
+    Only paths under RESUME_COMPRESSION['path_prefix'] are compressed, so
+    pages carrying CSRF tokens (such as the admin) are left alone; gzip output
+    is padded with random bytes like Django's GZipMiddleware to mitigate
+    BREACH.
+    """
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        config = settings.RESUME_COMPRESSION
+
+        if not request.path.startswith(config["path_prefix"]):
+            return response
+        # Leave streaming, small or already encoded responses alone
+        if response.streaming or len(response.content) < config["min_size"]:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        wildcard = accepted.get("*", 0.0)
+        zstd_q = accepted.get("zstd", wildcard) if zstandard is not None else 0.0
+        gzip_q = accepted.get("gzip", wildcard)
+
+        if zstd_q > 0 and zstd_q >= gzip_q:
+            compressed = zstandard.ZstdCompressor(level=config["zstd_level"]).compress(response.content)
+            encoding = "zstd"
+        elif gzip_q > 0:
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            encoding = "gzip"
+        else:
+            return response
+
+        # Return the uncompressed content if compression doesn't save space
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(response.content))
+
+        # The body changed, so a strong ETag is no longer valid
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+
+        response.headers["Content-Encoding"] = encoding
+        return response
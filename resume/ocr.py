@@ -0,0 +1,213 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import caches
+from PyPDF2.generic import ArrayObject # type: ignore
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # Worker threads only wait on the pdftoppm/tesseract subprocesses,
+    # so the pool size is the number of OCR processes running at once
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RESUME_OCR["max_workers"],
+                thread_name_prefix="ocr",
+            )
+        return _executor
+
+
+def ocr_available():
+    """
+    OCR needs the poppler `pdftoppm` and `tesseract` binaries on the PATH.
+    """
+    config = settings.RESUME_OCR
+    return (
+        config["enabled"]
+        and shutil.which(config["pdftoppm_cmd"]) is not None
+        and shutil.which(config["tesseract_cmd"]) is not None
+    )
+
+
+def _page_images(page):
+    """
+    Return the image XObjects drawn on a page.
+    """
+    resources = page.get("/Resources")
+    if resources is None:
+        return []
+    resources = resources.get_object()
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        return []
+    xobjects = xobjects.get_object()
+
+    images = []
+    for name in xobjects:
+        xobject = xobjects[name].get_object()
+        if xobject.get("/Subtype") == "/Image":
+            images.append(xobject)
+    return images
+
+
+def is_image_only(page, text):
+    """
+    A page needs OCR when it yields no text but draws at least one image.
+    """
+    return not text.strip() and bool(_page_images(page))
+
+
+def _raw_stream_data(stream):
+    # The bytes as stored in the file, without running them through the
+    # stream's filters (which is slow for large scans and fails for JBIG2)
+    return stream.get_object()._data
+
+
+def page_hash(page):
+    """
+    Hash the content stream and the embedded images of a page, so the same
+    scan uploaded again (even inside a different PDF) hits the OCR cache.
+    """
+    digest = hashlib.sha256()
+    contents = page.get("/Contents")
+    if contents is not None:
+        contents = contents.get_object()
+        streams = contents if isinstance(contents, ArrayObject) else [contents]
+        for stream in streams:
+            digest.update(_raw_stream_data(stream))
+    for image in _page_images(page):
+        digest.update(_raw_stream_data(image))
+    return digest.hexdigest()
+
+
+def render_dpi(page):
+    """
+    Pick a DPI that renders the page at roughly `target_pixels` on its long
+    side: small pages get more resolution, oversized pages less.
+    """
+    config = settings.RESUME_OCR
+    width = float(page.mediabox.width)
+    height = float(page.mediabox.height)
+    long_side_inches = max(width, height) / 72.0
+    if long_side_inches <= 0:
+        return config["max_dpi"]
+    dpi = int(config["target_pixels"] / long_side_inches)
+    return max(config["min_dpi"], min(dpi, config["max_dpi"]))
+
+
+def _ocr_page(pdf_path, page_number, dpi, deadline):
+    """
+    Render one page with pdftoppm and pipe the image into tesseract.
+    """
+    config = settings.RESUME_OCR
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("OCR time budget exhausted")
+    rendered = subprocess.run(
+        [config["pdftoppm_cmd"], "-png", "-singlefile", "-r", str(dpi),
+         "-f", str(page_number), "-l", str(page_number), pdf_path],
+        capture_output=True, check=True, timeout=remaining,
+    )
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("OCR time budget exhausted")
+    recognised = subprocess.run(
+        [config["tesseract_cmd"], "stdin", "stdout", "-l", config["language"]],
+        input=rendered.stdout, capture_output=True, check=True, timeout=remaining,
+    )
+    return recognised.stdout.decode("utf-8", errors="ignore")
+
+
+def ocr_image_only_pages(pdf_reader, file_content, page_texts):
+    """
+    Fill in the text of image-only pages using OCR, in place.
+
+    Only pages where `extract_text()` came back empty and that contain an
+    image are sent to tesseract. Results are cached by page hash, OCR
+    engine, language and DPI, and the whole document shares a single time
+    budget; pages that do not finish in time are left empty.
+
+    Returns the 1-based numbers of the pages whose text came from OCR.
+    """
+    config = settings.RESUME_OCR
+    if not ocr_available():
+        return []
+
+    # Inspect each page on its own; a page PyPDF2 cannot walk or hash is
+    # skipped (and left empty) rather than failing the whole document
+    pending = {}
+    for index, (page, text) in enumerate(zip(pdf_reader.pages, page_texts)):
+        try:
+            if is_image_only(page, text):
+                pending[index] = (page_hash(page), render_dpi(page))
+        except Exception as e:
+            print(f"Skipping OCR for page {index + 1}: {e}")
+    if not pending:
+        return []
+
+    cache = caches[config["cache"]]
+    engine = hashlib.sha256(f"{config['tesseract_cmd']}\0{config['language']}".encode("utf-8")).hexdigest()
+    ocr_pages = []
+    to_run = {}
+    for index, (digest, dpi) in pending.items():
+        # Text recognised with another engine, language or resolution is
+        # not reused
+        key = f"ocr:{digest}:{engine}:{dpi}"
+        cached = cache.get(key)
+        if cached is not None:
+            page_texts[index] = cached
+            ocr_pages.append(index + 1)
+        else:
+            to_run[index] = (key, dpi)
+
+    if not to_run:
+        return ocr_pages
+
+    deadline = time.monotonic() + config["time_budget"]
+    # pdftoppm reads from a file, so the upload is written out once per document
+    handle, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(handle, "wb") as pdf_file:
+            pdf_file.write(file_content)
+
+        executor = _get_executor()
+        futures = {
+            executor.submit(_ocr_page, pdf_path, index + 1, dpi, deadline): (index, key)
+            for index, (key, dpi) in to_run.items()
+        }
+        done, not_done = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+        for future in not_done:
+            future.cancel()
+
+        for future in done:
+            index, key = futures[future]
+            try:
+                text = future.result()
+            except (subprocess.SubprocessError, OSError, TimeoutError) as e:
+                print(f"OCR failed for page {index + 1}: {e}")
+                continue
+            cache.set(key, text, timeout=config["cache_timeout"])
+            page_texts[index] = text
+            ocr_pages.append(index + 1)
+
+        # Let running subprocesses finish (bounded by the deadline) before
+        # the temporary file is removed
+        wait([future for future in not_done if not future.cancelled()])
+    finally:
+        os.remove(pdf_path)
+
+    return sorted(ocr_pages)
@@ -0,0 +1,28 @@
+from rest_framework.renderers import BaseRenderer # type: ignore
+
+try:
+    import msgpack # type: ignore
+except ImportError:  # MessagePack responses are only offered when msgpack is installed
+    msgpack = None
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders responses as MessagePack, for clients that send
+    `Accept: application/msgpack` or `?format=msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True)
+
+
+# Formats that get feedback codes instead of full messages
+COMPACT_FORMATS = {MessagePackRenderer.format}
+
+COMPACT_RENDERER_CLASSES = [MessagePackRenderer] if msgpack is not None else []
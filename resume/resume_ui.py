@@ -12,6 +12,20 @@ from PyQt5.QtWidgets import ( # type: ignore
 def clean_text(text):
     return re.sub(r'[^\x00-\x7F]+', '', text)
 
+def format_changes(changes):
+    # Summarise how the score moved since the previous submission
+    lines = [f"Change since last submission: {changes['score_delta']:+d}"]
+    for section in changes.get('sections', []):
+        line = f"  {section['section'].title()} ({section['status']})"
+        if 'score_delta' in section:
+            line += f": {section['score_delta']:+d}"
+        lines.append(line)
+    for message in changes.get('feedback_added', []):
+        lines.append(f"  New: {message}")
+    for message in changes.get('feedback_removed', []):
+        lines.append(f"  Resolved: {message}")
+    return "\n".join(lines)
+
 def generate_pdf(response):
     # Creating the PDF
     pdf = FPDF()
@@ -89,6 +103,9 @@ class ResumeApp(QWidget):
         super().__init__()  # Fixed initialization
         self.setWindowTitle("Resume Scorer & Builder")
         self.setGeometry(100, 100, 600, 400)
+        # Score version of the last submission of each file, sent back on
+        # resubmission so the server only re-scores the edited sections
+        self.score_versions = {}
         self.init_ui()
 
     def init_ui(self):
@@ -118,16 +135,24 @@ class ResumeApp(QWidget):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Resume File", "", "Documents (*.pdf *.docx *.txt)")
         if file_path:
             try:
+                form_data = {}
+                if file_path in self.score_versions:
+                    form_data['previous_version'] = self.score_versions[file_path]
                 with open(file_path, 'rb') as f:
                     files = {'resume': f}
-                    response = requests.post("http://127.0.0.1:8000/api/resume-score/", files=files)
+                    response = requests.post("http://127.0.0.1:8000/api/resume-score/", files=files, data=form_data)
 
                 if response.status_code == 200:
                     data = response.json()
-                    score = data.get('ats_score', {}).get('total_score', 'N/A')
-                    breakdown = data.get('ats_score', {}).get('breakdown', {})
-                    feedback = data.get('ats_score', {}).get('feedback', [])
+                    ats_score = data.get('ats_score', {})
+                    score = ats_score.get('total_score', 'N/A')
+                    breakdown = ats_score.get('breakdown', {})
+                    feedback = ats_score.get('feedback', [])
                     msg = f"Score: {score}\n\nBreakdown: {breakdown}\n\nFeedback:\n" + "\n".join(feedback)
+                    if ats_score.get('changes'):
+                        msg += "\n\n" + format_changes(ats_score['changes'])
+                    if ats_score.get('version'):
+                        self.score_versions[file_path] = ats_score['version']
                     QMessageBox.information(self, "Resume Score", msg)
                 else:
                     QMessageBox.warning(self, "Error", f"Failed to score resume:\n{response.text}")
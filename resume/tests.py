@@ -1,3 +1,451 @@
-from django.test import TestCase
+import subprocess
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from PyPDF2 import PageObject, PdfReader, PdfWriter # type: ignore
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject # type: ignore
+from rest_framework.response import Response # type: ignore
+from rest_framework.test import APIRequestFactory, force_authenticate # type: ignore
+from rest_framework.views import APIView # type: ignore
+
+from . import throttling
+from .middleware import CompressionMiddleware
+from .ocr import ocr_image_only_pages
+from .throttling import AdmissionControlMixin, ConcurrencyLimiter, get_limiter
+from .renderers import msgpack
+from .views import FEEDBACK_MESSAGES, AdmissionMetricsAPIView, FeedbackMessagesAPIView, ResumeScoreAPIView
+
+
+ADMISSION_CONTROL = {
+    'test': {
+        'max_concurrent': 1,
+        'max_queue': 0,
+        'queue_timeout': 0.05,
+        'retry_after': 3,
+    },
+}
+
+RATE_LIMIT = {
+    'rate': 60,
+    'burst': 2,
+    'api_key_header': 'HTTP_X_API_KEY',
+    'api_keys': {'known-key'},
+    'trusted_proxies': 0,
+    'cache': 'default',
+}
+
+NO_RATE_LIMIT = dict(RATE_LIMIT, rate=0)
+
+
+class OkView(AdmissionControlMixin, APIView):
+    admission_scope = 'test'
+
+    def post(self, request):
+        return Response({'ok': True})
+
+
+class FailingView(AdmissionControlMixin, APIView):
+    admission_scope = 'test'
+
+    def post(self, request):
+        raise RuntimeError('boom')
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+    def test_rejects_when_queue_is_full(self):
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=1)
+        self.assertIsNone(limiter.acquire())
+        self.assertEqual(limiter.acquire(), 'queue_full')
+        self.assertEqual(limiter.active, 1)
+
+    def test_times_out_waiting_in_queue(self):
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        self.assertIsNone(limiter.acquire())
+        self.assertEqual(limiter.acquire(), 'queue_timeout')
+        self.assertEqual(limiter.waiting, 0)
+
+    def test_release_admits_next_request(self):
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=1)
+        self.assertIsNone(limiter.acquire())
+        limiter.release()
+        self.assertIsNone(limiter.acquire())
+
+
+@override_settings(RESUME_ADMISSION_CONTROL=ADMISSION_CONTROL, RESUME_RATE_LIMIT=NO_RATE_LIMIT)
+class AdmissionControlViewTests(SimpleTestCase):
+    def setUp(self):
+        throttling._limiters.clear()
+        throttling._metrics.clear()
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def test_slot_released_when_view_raises(self):
+        with self.assertRaises(RuntimeError):
+            FailingView.as_view()(self.factory.post('/'))
+        self.assertEqual(get_limiter('test').active, 0)
+
+    def test_overloaded_returns_503_with_retry_after(self):
+        limiter = get_limiter('test')
+        limiter.acquire()
+        try:
+            response = OkView.as_view()(self.factory.post('/'))
+        finally:
+            limiter.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertEqual(throttling.get_metrics()['test']['rejected_queue_full'], 1)
+
+    def test_metrics_require_staff(self):
+        request = self.factory.get('/api/metrics/')
+        self.assertEqual(AdmissionMetricsAPIView.as_view()(request).status_code, 403)
+
+        request = self.factory.get('/api/metrics/')
+        force_authenticate(request, user=SimpleNamespace(is_staff=True, is_authenticated=True))
+        self.assertEqual(AdmissionMetricsAPIView.as_view()(request).status_code, 200)
+
+    @override_settings(RESUME_RATE_LIMIT=RATE_LIMIT)
+    @mock.patch('resume.throttling.time.time', return_value=1000.0)
+    def test_rate_limited_returns_429_with_retry_after(self, _time):
+        view = OkView.as_view()
+        for _ in range(2):
+            self.assertEqual(view(self.factory.post('/')).status_code, 200)
+        response = view(self.factory.post('/'))
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(RESUME_RATE_LIMIT=RATE_LIMIT)
+    def test_bucket_refills_at_rate(self):
+        view = OkView.as_view()
+        # 60 requests per minute with a burst of 2: the bucket empties after
+        # two requests and a token comes back every second, with no window
+        # boundary letting a second burst through
+        with mock.patch('resume.throttling.time.time', return_value=1000.0):
+            statuses = [view(self.factory.post('/')).status_code for _ in range(3)]
+        with mock.patch('resume.throttling.time.time', return_value=1001.0):
+            statuses += [view(self.factory.post('/')).status_code for _ in range(2)]
+        self.assertEqual(statuses, [200, 200, 429, 200, 429])
+
+    @override_settings(RESUME_RATE_LIMIT=RATE_LIMIT)
+    @mock.patch('resume.throttling.time.time', return_value=1000.0)
+    def test_concurrent_requests_cannot_overdraw_bucket(self, _time):
+        view = OkView.as_view()
+        statuses = []
+
+        def post():
+            statuses.append(view(self.factory.post('/')).status_code)
+
+        with override_settings(RESUME_ADMISSION_CONTROL={'test': dict(ADMISSION_CONTROL['test'], max_concurrent=20)}):
+            threads = [threading.Thread(target=post) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(statuses.count(200), 2)
+
+    @override_settings(RESUME_RATE_LIMIT=RATE_LIMIT)
+    @mock.patch('resume.throttling.time.time', return_value=1000.0)
+    def test_unknown_api_keys_share_the_ip_limit(self, _time):
+        view = OkView.as_view()
+        statuses = [
+            view(self.factory.post('/', HTTP_X_API_KEY=f'random-{i}')).status_code
+            for i in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+        # A configured key gets its own limit
+        self.assertEqual(view(self.factory.post('/', HTTP_X_API_KEY='known-key')).status_code, 200)
+
+    @override_settings(RESUME_RATE_LIMIT=RATE_LIMIT)
+    @mock.patch('resume.throttling.time.time', return_value=1000.0)
+    def test_spoofed_forwarded_for_shares_one_limit(self, _time):
+        view = OkView.as_view()
+        statuses = [
+            view(self.factory.post('/', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')).status_code
+            for i in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 429, 429])
+
+    @override_settings(RESUME_RATE_LIMIT=dict(RATE_LIMIT, trusted_proxies=1))
+    @mock.patch('resume.throttling.time.time', return_value=1000.0)
+    def test_forwarded_for_used_behind_trusted_proxy(self, _time):
+        view = OkView.as_view()
+        statuses = [
+            view(self.factory.post('/', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')).status_code
+            for i in range(4)
+        ]
+        self.assertEqual(statuses, [200] * 4)
+
+
+def build_scanned_pdf():
+    """
+    A three page PDF: a text page, a page that only draws an image (like a
+    scan) and a blank page.
+    """
+    writer = PdfWriter()
+
+    text_page = PageObject.create_blank_page(None, 612, 792)
+    font = DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    })
+    text_page[NameObject('/Resources')] = DictionaryObject({
+        NameObject('/Font'): DictionaryObject({NameObject('/F1'): writer._add_object(font)}),
+    })
+    contents = DecodedStreamObject()
+    contents.set_data(b'BT /F1 12 Tf 72 720 Td (Python developer) Tj ET')
+    text_page[NameObject('/Contents')] = writer._add_object(contents)
+
+    scanned_page = PageObject.create_blank_page(None, 612, 792)
+    image = DecodedStreamObject()
+    image.set_data(b'\x80')
+    image.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Image'),
+        NameObject('/Width'): NumberObject(1),
+        NameObject('/Height'): NumberObject(1),
+        NameObject('/ColorSpace'): NameObject('/DeviceGray'),
+        NameObject('/BitsPerComponent'): NumberObject(8),
+    })
+    scanned_page[NameObject('/Resources')] = DictionaryObject({
+        NameObject('/XObject'): DictionaryObject({NameObject('/Im0'): writer._add_object(image)}),
+    })
+    contents = DecodedStreamObject()
+    contents.set_data(b'q 612 0 0 792 0 0 cm /Im0 Do Q')
+    scanned_page[NameObject('/Contents')] = writer._add_object(contents)
+
+    writer.add_page(text_page)
+    writer.add_page(scanned_page)
+    writer.add_blank_page(612, 792)
+
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def fake_ocr_run(args, **kwargs):
+    if args[0] == 'pdftoppm':
+        return subprocess.CompletedProcess(args, 0, stdout=b'png', stderr=b'')
+    return subprocess.CompletedProcess(args, 0, stdout=b'Scanned resume text', stderr=b'')
+
+
+def slow_ocr_run(args, **kwargs):
+    time.sleep(0.3)
+    return fake_ocr_run(args, **kwargs)
+
+
+class BrokenPage:
+    mediabox = None
+
+    def get(self, key, default=None):
+        raise ValueError('corrupt resources')
+
+
+@mock.patch('resume.ocr.ocr_available', return_value=True)
+class OcrFallbackTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.pdf = build_scanned_pdf()
+
+    def run_ocr(self):
+        reader = PdfReader(BytesIO(self.pdf))
+        page_texts = [page.extract_text() for page in reader.pages]
+        return ocr_image_only_pages(reader, self.pdf, page_texts), page_texts
+
+    def test_only_image_only_pages_are_sent_to_ocr(self, _available):
+        with mock.patch('resume.ocr.subprocess.run', side_effect=fake_ocr_run) as run:
+            ocr_pages, page_texts = self.run_ocr()
+        self.assertEqual(ocr_pages, [2])
+        self.assertEqual(page_texts, ['Python developer', 'Scanned resume text', ''])
+        rendered = [call.args[0] for call in run.call_args_list if call.args[0][0] == 'pdftoppm']
+        self.assertEqual(len(rendered), 1)
+        self.assertEqual(rendered[0][rendered[0].index('-f') + 1], '2')
+
+    def test_resubmission_is_served_from_cache(self, _available):
+        with mock.patch('resume.ocr.subprocess.run', side_effect=fake_ocr_run):
+            self.run_ocr()
+        with mock.patch('resume.ocr.subprocess.run', side_effect=fake_ocr_run) as run:
+            ocr_pages, page_texts = self.run_ocr()
+        run.assert_not_called()
+        self.assertEqual(ocr_pages, [2])
+        self.assertEqual(page_texts[1], 'Scanned resume text')
+
+    def test_language_change_bypasses_cache(self, _available):
+        with mock.patch('resume.ocr.subprocess.run', side_effect=fake_ocr_run):
+            self.run_ocr()
+        with override_settings(RESUME_OCR=dict(settings.RESUME_OCR, language='deu')):
+            with mock.patch('resume.ocr.subprocess.run', side_effect=fake_ocr_run) as run:
+                self.run_ocr()
+        self.assertIn('deu', run.call_args.args[0])
+
+    def test_pages_over_time_budget_stay_empty(self, _available):
+        with override_settings(RESUME_OCR=dict(settings.RESUME_OCR, time_budget=0.05)):
+            with mock.patch('resume.ocr.subprocess.run', side_effect=slow_ocr_run):
+                ocr_pages, page_texts = self.run_ocr()
+        self.assertEqual(ocr_pages, [])
+        self.assertEqual(page_texts, ['Python developer', '', ''])
+
+    def test_unreadable_page_is_skipped(self, _available):
+        reader = mock.Mock(pages=[BrokenPage()])
+        page_texts = ['']
+        self.assertEqual(ocr_image_only_pages(reader, b'', page_texts), [])
+        self.assertEqual(page_texts, [''])
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = CompressionMiddleware(lambda request: HttpResponse(b'{"total_score": 50}' * 200))
+
+    def test_zstd_with_zero_q_is_not_used(self):
+        zstandard = mock.Mock()
+        with mock.patch('resume.middleware.zstandard', zstandard):
+            response = self.middleware(self.factory.get('/api/resume-score/', HTTP_ACCEPT_ENCODING='zstd;q=0, gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        zstandard.ZstdCompressor.assert_not_called()
+
+    def test_non_api_paths_are_not_compressed(self):
+        response = self.middleware(self.factory.get('/admin/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+RESUME_TEXT = """Jane Doe
+jane.doe@example.com
+Summary
+Analyst with 3 years of experience.
+Skills
+Python, leadership
+Education
+Bachelor degree, state college
+"""
+
+EDITED_RESUME_TEXT = RESUME_TEXT.replace("Python,", "Python, SQL, Docker,")
+
+
+class IncrementalScoringTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.view = ResumeScoreAPIView()
+
+    def score(self, text, **data):
+        request_data = SimpleNamespace(data={'job_title': 'Data Analyst', **data})
+        return self.view.expand_feedback(self.view.calculate_ats_score(text, request_data))
+
+    def test_matches_single_pass_scorer(self):
+        # Expected values come from the scorer before it was split into sections
+        result = self.score(RESUME_TEXT)
+        self.assertEqual(result['total_score'], 59)
+        self.assertEqual(result['breakdown'], {
+            'keywords': 21,
+            'education': 9,
+            'experience': 10,
+            'skills': 6,
+            'formatting': 13,
+        })
+        self.assertEqual(result['feedback'], [
+            "Your resume contains some relevant keywords, but could benefit from more specific terminology.",
+            "Your education section could be enhanced with more details about degrees and institutions.",
+            "Your experience section is solid but could benefit from more specific accomplishments.",
+            "Consider listing more relevant technical and soft skills.",
+            "Your resume is well-structured and formatted appropriately.",
+        ])
+
+    def test_resubmission_only_rematches_changed_sections(self):
+        self.score(RESUME_TEXT)
+        with mock.patch.object(self.view, 'count_hits', wraps=self.view.count_hits) as count_hits:
+            result = self.score(EDITED_RESUME_TEXT)
+        self.assertEqual(count_hits.call_count, 1)
+        self.assertIn('Python, SQL, Docker', count_hits.call_args[0][0])
+        self.assertEqual(result['total_score'], 71)
+
+    def test_changes_against_previous_version(self):
+        previous = self.score(RESUME_TEXT)
+        result = self.score(EDITED_RESUME_TEXT, previous_version=previous['version'])
+        changes = result['changes']
+        self.assertEqual(changes['score_delta'], 12)
+        self.assertEqual(changes['breakdown_delta'], {
+            'keywords': 4,
+            'education': 0,
+            'experience': 0,
+            'skills': 8,
+            'formatting': 0,
+        })
+        self.assertEqual(changes['feedback_added'], [
+            "Your skills section is good but could highlight more technical proficiencies.",
+        ])
+        self.assertEqual(changes['feedback_removed'], [
+            "Consider listing more relevant technical and soft skills.",
+        ])
+        self.assertEqual(changes['sections'], [{
+            'section': 'skills',
+            'status': 'modified',
+            'score_delta': 12,
+            'breakdown_delta': changes['breakdown_delta'],
+        }])
+
+    def test_rule_changes_invalidate_cached_hits(self):
+        self.score(RESUME_TEXT)
+        with mock.patch.object(ResumeScoreAPIView, 'soft_skills', ['leadership', 'negotiation']):
+            with mock.patch.object(self.view, 'count_hits', wraps=self.view.count_hits) as count_hits:
+                self.score(RESUME_TEXT)
+        self.assertEqual(count_hits.call_count, 4)
+
+
+RESUME_PDF = Path(__file__).resolve().parent / 'resume.pdf'
+
+
+@override_settings(RESUME_RATE_LIMIT=NO_RATE_LIMIT)
+@mock.patch('resume.ocr.ocr_available', return_value=False)
+class FeedbackFormatTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def post_resume(self, path='/api/resume-score/', **extra):
+        with open(RESUME_PDF, 'rb') as resume_file:
+            request = self.factory.post(path, {'resume': resume_file}, format='multipart', **extra)
+            response = ResumeScoreAPIView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_json_response_expands_feedback_codes(self, _available):
+        feedback = self.post_resume().data['ats_score']['feedback']
+        self.assertEqual(len(feedback), 5)
+        for message in feedback:
+            self.assertIn(message, FEEDBACK_MESSAGES.values())
+
+    def test_feedback_codes_on_request(self, _available):
+        feedback = self.post_resume('/api/resume-score/?feedback=codes').data['ats_score']['feedback']
+        self.assertEqual(len(feedback), 5)
+        for code in feedback:
+            self.assertIn(code, FEEDBACK_MESSAGES)
+
+    def test_lookup_table_covers_every_code(self, _available):
+        view = ResumeScoreAPIView()
+        emitted = set()
+        for value in (0, 12, 19, 25, 35):
+            scores = dict.fromkeys(['keywords', 'education', 'experience', 'skills', 'formatting'], value)
+            emitted.update(view.feedback_codes(scores))
+        self.assertEqual(emitted, set(FEEDBACK_MESSAGES))
+
+        response = FeedbackMessagesAPIView.as_view()(self.factory.get('/api/feedback-messages/'))
+        self.assertEqual(response.data, FEEDBACK_MESSAGES)
+
+    @skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_round_trip(self, _available):
+        response = self.post_resume(HTTP_ACCEPT='application/msgpack')
+        response.render()
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(set(data['ats_score']['breakdown']), {
+            'keywords', 'education', 'experience', 'skills', 'formatting',
+        })
+        for code in data['ats_score']['feedback']:
+            self.assertIn(code, FEEDBACK_MESSAGES)
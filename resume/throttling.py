@@ -0,0 +1,233 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import APIException # type: ignore
+from rest_framework.throttling import BaseThrottle # type: ignore
+
+
+# In-process counters, exposed through the metrics endpoint
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _incr(scope, name, amount=1):
+    with _metrics_lock:
+        counters = _metrics.setdefault(scope, {})
+        counters[name] = counters.get(name, 0) + amount
+
+
+def get_metrics():
+    """
+    Return a snapshot of the admission and rate limit counters, plus the
+    current in-flight and queued requests of every concurrency limiter.
+    """
+    with _metrics_lock:
+        snapshot = {scope: dict(counters) for scope, counters in _metrics.items()}
+    for scope, limiter in list(_limiters.items()):
+        scope_metrics = snapshot.setdefault(scope, {})
+        scope_metrics["in_flight"] = limiter.active
+        scope_metrics["queued"] = limiter.waiting
+        scope_metrics["max_concurrent"] = limiter.max_concurrent
+        scope_metrics["max_queue"] = limiter.max_queue
+    return snapshot
+
+
+class Overloaded(APIException):
+    status_code = 503
+    default_detail = 'Server is busy, please retry later.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait=None, detail=None):
+        super().__init__(detail)
+        # The DRF exception handler turns `wait` into a Retry-After header
+        self.wait = wait
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of requests running at once, with a bounded queue of
+    requests waiting for a free slot. Requests arriving while the queue is
+    full are rejected straight away instead of piling up.
+    """
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Try to take a slot. Returns None on success, otherwise the reason
+        for the rejection ("queue_full" or "queue_timeout").
+        """
+        with self._cond:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                return None
+            if self.waiting >= self.max_queue:
+                return "queue_full"
+
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return "queue_timeout"
+                    self._cond.wait(remaining)
+                self.active += 1
+                return None
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(scope):
+    with _limiters_lock:
+        limiter = _limiters.get(scope)
+        if limiter is None:
+            config = settings.RESUME_ADMISSION_CONTROL[scope]
+            limiter = ConcurrencyLimiter(
+                config["max_concurrent"],
+                config["max_queue"],
+                config["queue_timeout"],
+            )
+            _limiters[scope] = limiter
+        return limiter
+
+
+class ClientRateThrottle(BaseThrottle):
+    """
+    Per-client token bucket holding up to `burst` tokens and refilled at
+    `rate`, so at most `burst` requests go through at once and `rate` on
+    average. Clients are identified by their API key when it is one of the
+    configured keys, and by their IP address otherwise.
+
+    The bucket is read and written while holding a per-client lock taken
+    with cache.add(), which is atomic in the shared backends (Redis,
+    memcached), so the limit holds across workers when the cache is shared.
+    """
+    # How long to wait for another request of the same client to release
+    # the bucket, and how long a lock outlives a crashed worker
+    lock_wait = 0.05
+    lock_timeout = 1
+
+    def __init__(self):
+        config = settings.RESUME_RATE_LIMIT
+        self.rate = config["rate"] / 60.0  # requests per second
+        self.burst = config["burst"]
+        self.api_key_header = config["api_key_header"]
+        self.api_keys = config["api_keys"]
+        self.trusted_proxies = config["trusted_proxies"]
+        self.cache = caches[config["cache"]]
+        self.tokens = 0.0
+
+    def get_client_ip(self, request):
+        """
+        The client address. X-Forwarded-For is client-controlled, so it is
+        only used when `trusted_proxies` reverse proxies sit in front of the
+        app, taking the address the outermost trusted proxy saw.
+        """
+        forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+        if self.trusted_proxies and forwarded_for:
+            addresses = [address.strip() for address in forwarded_for.split(",")]
+            return addresses[-min(self.trusted_proxies, len(addresses))]
+        return request.META.get("REMOTE_ADDR")
+
+    def get_cache_key(self, request, view):
+        api_key = request.META.get(self.api_key_header)
+        if api_key and api_key in self.api_keys:
+            ident = f"key:{api_key}"
+        else:
+            ident = f"ip:{self.get_client_ip(request)}"
+        # Client-supplied values are hashed so they are always a valid cache key
+        ident = hashlib.sha256(ident.encode("utf-8")).hexdigest()
+        scope = getattr(view, "admission_scope", "default")
+        return f"throttle:{scope}:{ident}"
+
+    def _lock(self, lock_key):
+        deadline = time.monotonic() + self.lock_wait
+        while not self.cache.add(lock_key, 1, timeout=self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def allow_request(self, request, view):
+        if self.rate <= 0:
+            return True
+
+        key = self.get_cache_key(request, view)
+        lock_key = f"{key}:lock"
+        if not self._lock(lock_key):
+            # Too many concurrent requests from this client to even update
+            # its bucket; treat it as over the limit
+            self.tokens = 0.0
+            _incr(getattr(view, "admission_scope", "default"), "throttled")
+            return False
+
+        try:
+            now = time.time()
+            tokens, updated = self.cache.get(key, (self.burst, now))
+
+            # Refill for the time elapsed since the bucket was last touched
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+
+            self.tokens = tokens
+            self.cache.set(key, (tokens, now), timeout=int(self.burst / self.rate) + 1)
+        finally:
+            self.cache.delete(lock_key)
+
+        if not allowed:
+            _incr(getattr(view, "admission_scope", "default"), "throttled")
+        return allowed
+
+    def wait(self):
+        return max((1 - self.tokens) / self.rate, 1)
+
+
+class AdmissionControlMixin:
+    """
+    Applies the per-client rate limit and the per-endpoint concurrency limit
+    to an APIView. Set `admission_scope` to a key of RESUME_ADMISSION_CONTROL.
+    """
+    admission_scope = None
+    throttle_classes = [ClientRateThrottle]
+
+    def initial(self, request, *args, **kwargs):
+        # Rate limiting runs first so throttled clients never take a queue slot
+        super().initial(request, *args, **kwargs)
+
+        limiter = get_limiter(self.admission_scope)
+        rejection = limiter.acquire()
+        if rejection is not None:
+            _incr(self.admission_scope, f"rejected_{rejection}")
+            raise Overloaded(wait=settings.RESUME_ADMISSION_CONTROL[self.admission_scope]["retry_after"])
+
+        self._admission_limiter = limiter
+        _incr(self.admission_scope, "admitted")
+
+    def dispatch(self, request, *args, **kwargs):
+        self._admission_limiter = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._admission_limiter is not None:
+                self._admission_limiter.release()
@@ -5,4 +5,6 @@ urlpatterns = [
     path('resume-score/', views.ResumeScoreAPIView.as_view(), name='resume-score'),
     path('welcome/', views.welcome, name='welcome'),
     path('build-resume/', views.BuildResumeAPIView.as_view(), name='build-resume'),
+    path('feedback-messages/', views.FeedbackMessagesAPIView.as_view(), name='feedback-messages'),
+    path('metrics/', views.AdmissionMetricsAPIView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -1,16 +1,107 @@
+from django.conf import settings
 from django.http import HttpResponse
 from rest_framework.views import APIView # type: ignore
 from rest_framework.response import Response # type: ignore
 from rest_framework import status # type: ignore
+from rest_framework.permissions import IsAdminUser # type: ignore
+from rest_framework.settings import api_settings # type: ignore
 from PyPDF2 import PdfReader # type: ignore
 from io import BytesIO
 import re  # Add missing import
 import requests  # Add missing import
+from .incremental import diff_versions, get_section_hits, load_version, merge_hits, save_version, scoring_signature, split_sections
+from .ocr import ocr_image_only_pages
+from .renderers import COMPACT_FORMATS, COMPACT_RENDERER_CLASSES
+from .throttling import AdmissionControlMixin, get_metrics
+
+FEEDBACK_MESSAGES = {
+    "keywords.low": "Consider adding more relevant industry keywords to your resume.",
+    "keywords.some": "Your resume contains some relevant keywords, but could benefit from more specific terminology.",
+    "keywords.good": "Good use of relevant keywords throughout your resume.",
+    "education.low": "Your education section could be enhanced with more details about degrees and institutions.",
+    "education.good": "Your education details are well presented.",
+    "experience.low": "Add more quantifiable achievements and details to your work experience.",
+    "experience.some": "Your experience section is solid but could benefit from more specific accomplishments.",
+    "experience.good": "Your experience section appears comprehensive and well-detailed.",
+    "skills.low": "Consider listing more relevant technical and soft skills.",
+    "skills.some": "Your skills section is good but could highlight more technical proficiencies.",
+    "skills.good": "Excellent range of skills highlighted in your resume.",
+    "formatting.low": "Improve your resume structure with clear section headers and better organization.",
+    "formatting.good": "Your resume is well-structured and formatted appropriately.",
+}
 
 def welcome(request):
     return HttpResponse("Welcome to the Resume Scoring API!")
 
-class ResumeScoreAPIView(APIView):
+class AdmissionMetricsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_metrics(), status=status.HTTP_200_OK)
+
+class FeedbackMessagesAPIView(APIView):
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COMPACT_RENDERER_CLASSES
+
+    def get(self, request):
+        return Response(FEEDBACK_MESSAGES, status=status.HTTP_200_OK)
+
+class ResumeScoreAPIView(AdmissionControlMixin, APIView):
+    admission_scope = "resume-score"
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COMPACT_RENDERER_CLASSES
+
+    # Keywords weighted by importance, counted with a cap per keyword
+    general_keywords = {
+        "experience": 5,
+        "education": 3,
+        "skills": 5,
+        "projects": 3,
+        "certifications": 3,
+        "achievements": 4,
+        "leadership": 4,
+        "communication": 3,
+        "teamwork": 3,
+        "problem solving": 4,
+        "analytical": 3,
+        "responsible": 2,
+        "managed": 3,
+        "developed": 3,
+        "implemented": 3,
+    }
+
+    education_terms = ["bachelor", "master", "phd", "degree", "diploma", "university", "college"]
+    prestigious_schools = ["harvard", "stanford", "mit", "oxford", "cambridge"]
+    relevant_fields = ["computer science", "information technology"]
+
+    experience_indicators = [
+        "years of experience",
+        "year experience",
+        "years experience",
+        "worked as",
+        "work experience"
+    ]
+
+    technical_skills = [
+        "python", "java", "javascript", "c++", "sql", "aws", "azure",
+        "docker", "kubernetes", "react", "angular", "vue", "django",
+        "node.js", "tensorflow", "pytorch", "machine learning", "ai"
+    ]
+
+    soft_skills = [
+        "leadership", "communication", "teamwork", "project management",
+        "time management", "problem solving", "critical thinking"
+    ]
+
+    section_headers = [
+        "experience", "education", "skills", "projects",
+        "certifications", "publications", "summary", "objective"
+    ]
+
+    contact_patterns = [
+        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email
+        r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',  # Phone number
+        r'linkedin\.com\/in\/[\w-]+'  # LinkedIn
+    ]
+
     def post(self, request):
         if 'resume' not in request.FILES:
             return Response({'error': 'No resume file provided.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -31,15 +122,22 @@ class ResumeScoreAPIView(APIView):
             file_content = resume_file.read()  # Read the file content into memory
             print("File content type:", type(file_content))  # Debugging: Print the file content type
             pdf_reader = PdfReader(BytesIO(file_content))
-            resume_text = ""
-            for page in pdf_reader.pages:
-                resume_text += page.extract_text()
+            page_texts = [page.extract_text() or "" for page in pdf_reader.pages]
+
+            # Scanned pages have no text layer, send only those through OCR
+            ocr_pages = ocr_image_only_pages(pdf_reader, file_content, page_texts)
+            resume_text = "".join(page_texts)
             # Debugging: Print the first 100 characters of the extracted text
             print(f"Extracted text (first 100 chars): {resume_text[:100]}")
 
             # Calculate ATS score - pass request to the function
             score = self.calculate_ats_score(resume_text, request)
-            return Response({'ats_score': score}, status=status.HTTP_200_OK)
+
+            # Compact clients get feedback codes and look the messages up once
+            # from /api/feedback-messages/
+            if request.query_params.get('feedback') != 'codes' and request.accepted_renderer.format not in COMPACT_FORMATS:
+                score = self.expand_feedback(score)
+            return Response({'ats_score': score, 'ocr_pages': ocr_pages}, status=status.HTTP_200_OK)
 
         except Exception as e:
             # Log the error for debugging
@@ -47,6 +145,81 @@ class ResumeScoreAPIView(APIView):
             return Response({'error': f'Error processing resume: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def calculate_ats_score(self, resume_text, request_data):
+        job_specific_keywords = self.get_job_specific_keywords(request_data)
+        signature = scoring_signature(self.scoring_rules(), job_specific_keywords)
+
+        # Match each section on its own; sections unchanged since an earlier
+        # submission reuse their cached hits instead of being re-matched
+        sections = [
+            (title, section_hash, get_section_hits(
+                text, section_hash, signature,
+                lambda section_text: self.count_hits(section_text, job_specific_keywords)))
+            for title, text, section_hash in split_sections(resume_text, self.section_headers)
+        ]
+        result = self.score_hits(merge_hits([hits for _, _, hits in sections]), job_specific_keywords)
+        result["version"] = save_version(sections, result, signature)
+
+        # Report which sections moved the score since the given version
+        previous_version = None
+        if hasattr(request_data, 'data'):
+            previous_version = request_data.data.get('previous_version')
+        if previous_version:
+            previous = load_version(previous_version)
+            if previous is not None:
+                result["changes"] = diff_versions(
+                    previous, sections, result, signature,
+                    lambda hits: self.score_hits(hits, job_specific_keywords))
+
+        return result
+
+    def scoring_rules(self):
+        """
+        The rule lists used by count_hits, so cached hits are tied to the
+        rules that produced them.
+        """
+        return {
+            "general_keywords": self.general_keywords,
+            "education_terms": self.education_terms,
+            "prestigious_schools": self.prestigious_schools,
+            "relevant_fields": self.relevant_fields,
+            "experience_indicators": self.experience_indicators,
+            "technical_skills": self.technical_skills,
+            "soft_skills": self.soft_skills,
+            "section_headers": self.section_headers,
+            "contact_patterns": self.contact_patterns,
+        }
+
+    def count_hits(self, text, job_specific_keywords):
+        """
+        Match a piece of resume text against every scoring rule. Hits from
+        separate pieces can be combined with merge_hits, so the score of a
+        whole resume can be built from the hits of its sections.
+        """
+        text_lower = text.lower()
+        terms = (
+            list(job_specific_keywords) + self.education_terms + self.prestigious_schools
+            + self.relevant_fields + self.experience_indicators
+            + self.technical_skills + self.soft_skills
+        )
+
+        return {
+            "keyword_counts": {
+                keyword: text_lower.count(keyword) for keyword in self.general_keywords
+            },
+            "terms": {term for term in terms if term in text_lower},
+            "years": [int(match) for match in re.findall(r'(\d+)[\+]?\s*(?:year|yr)s?', text_lower)],
+            "headers": {
+                header for header in self.section_headers
+                if f"{header}:" in text_lower or f"{header}\n" in text_lower
+            },
+            "contacts": {
+                index for index, pattern in enumerate(self.contact_patterns)
+                if re.search(pattern, text)
+            },
+            "word_count": len(text.split()),
+        }
+
+    def score_hits(self, hits, job_specific_keywords):
         # Initialize scores for different categories
         scores = {
             "keywords": 0,
@@ -55,115 +228,56 @@ class ResumeScoreAPIView(APIView):
             "skills": 0,
             "formatting": 0
         }
-
-        resume_lower = resume_text.lower()
+        terms = hits["terms"]
 
         # 1. Basic keyword relevance (weighted by importance and frequency)
-        general_keywords = {
-            "experience": 5,
-            "education": 3,
-            "skills": 5,
-            "projects": 3,
-            "certifications": 3,
-            "achievements": 4,
-            "leadership": 4,
-            "communication": 3,
-            "teamwork": 3,
-            "problem solving": 4,
-            "analytical": 3,
-            "responsible": 2,
-            "managed": 3,
-            "developed": 3,
-            "implemented": 3,
-        }
-
-        # Count keyword occurrences (with a cap to prevent keyword stuffing)
-        for keyword, weight in general_keywords.items():
-            occurrences = resume_lower.count(keyword)
+        for keyword, weight in self.general_keywords.items():
             # Cap at 3 occurrences per keyword to avoid over-counting
-            capped_occurrences = min(occurrences, 3)
+            capped_occurrences = min(hits["keyword_counts"].get(keyword, 0), 3)
             scores["keywords"] += capped_occurrences * weight
 
         # 2. Job-specific keywords (add support for job description matching)
-        job_specific_keywords = self.get_job_specific_keywords(request_data)
         for keyword, weight in job_specific_keywords.items():
-            if keyword in resume_lower:
+            if keyword in terms:
                 scores["keywords"] += weight
 
         # 3. Education scoring
-        education_terms = ["bachelor", "master", "phd", "degree", "diploma", "university", "college"]
-        education_score = sum(3 for term in education_terms if term in resume_lower)
+        education_score = sum(3 for term in self.education_terms if term in terms)
 
         # Add bonus for prestigious institutions (could be expanded)
-        prestigious_schools = ["harvard", "stanford", "mit", "oxford", "cambridge"]
-        education_score += sum(5 for school in prestigious_schools if school in resume_lower)
+        education_score += sum(5 for school in self.prestigious_schools if school in terms)
 
         # Education relevance
-        if "computer science" in resume_lower or "information technology" in resume_lower:
+        if any(field in terms for field in self.relevant_fields):
             education_score += 5
 
         scores["education"] = min(education_score, 25)  # Cap at 25
 
         # 4. Experience scoring
-        experience_indicators = [
-            "years of experience",
-            "year experience",
-            "years experience",
-            "worked as",
-            "work experience"
-        ]
-
-        experience_score = sum(4 for indicator in experience_indicators if indicator in resume_lower)
+        experience_score = sum(4 for indicator in self.experience_indicators if indicator in terms)
 
         # Look for experience durations
-        experience_matches = re.findall(r'(\d+)[\+]?\s*(?:year|yr)s?', resume_lower)
-        if experience_matches:
-            # Convert matches to integers and sum them up (capped at 10 years)
-            years = sum(min(int(match), 10) for match in experience_matches)
+        if hits["years"]:
+            # Sum up the durations found (each capped at 10 years)
+            years = sum(min(match, 10) for match in hits["years"])
             experience_score += min(years * 2, 20)  # 2 points per year, max 20
 
         scores["experience"] = min(experience_score, 25)  # Cap at 25
 
-        # 5. Skills scoring - technical skills are often more valuable
-        technical_skills = [
-            "python", "java", "javascript", "c++", "sql", "aws", "azure",
-            "docker", "kubernetes", "react", "angular", "vue", "django",
-            "node.js", "tensorflow", "pytorch", "machine learning", "ai"
-        ]
-
-        soft_skills = [
-            "leadership", "communication", "teamwork", "project management",
-            "time management", "problem solving", "critical thinking"
-        ]
-
-        # Give more weight to technical skills
-        skills_score = sum(4 for skill in technical_skills if skill in resume_lower)
-        skills_score += sum(2 for skill in soft_skills if skill in resume_lower)
+        # 5. Skills scoring - give more weight to technical skills
+        skills_score = sum(4 for skill in self.technical_skills if skill in terms)
+        skills_score += sum(2 for skill in self.soft_skills if skill in terms)
 
         scores["skills"] = min(skills_score, 25)  # Cap at 25
 
         # 6. Formatting and structure checks
-        section_headers = [
-            "experience", "education", "skills", "projects",
-            "certifications", "publications", "summary", "objective"
-        ]
-
-        format_score = sum(3 for header in section_headers
-                          if f"{header}:" in resume_lower or f"{header}\n" in resume_lower)
+        format_score = sum(3 for header in self.section_headers if header in hits["headers"])
 
         # Check for contact information
-        contact_patterns = [
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email
-            r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',  # Phone number
-            r'linkedin\.com\/in\/[\w-]+'  # LinkedIn
-        ]
-
-        format_score += sum(4 for pattern in contact_patterns
-                           if re.search(pattern, resume_text))
+        format_score += 4 * len(hits["contacts"])
 
         # Check for reasonable length (not too short, not too long)
-        word_count = len(resume_text.split())
-        if 300 <= word_count <= 1000:
+        if 300 <= hits["word_count"] <= 1000:
             format_score += 5
 
         scores["formatting"] = min(format_score, 20)  # Cap at 20
@@ -176,9 +290,9 @@ class ResumeScoreAPIView(APIView):
         return {
             "total_score": normalized_score,
             "breakdown": scores,
-            "feedback": self.generate_feedback(scores)
+            "feedback": self.feedback_codes(scores)
         }
-        
+
     def get_job_specific_keywords(self, request_data):
         """
         Extract job-specific keywords based on job description or job title if provided.
@@ -246,60 +360,79 @@ class ResumeScoreAPIView(APIView):
         
         return job_keywords
 
-    def generate_feedback(self, scores):
+    def feedback_codes(self, scores):
         """
-        Generate specific feedback based on the score breakdown.
+        Generate specific feedback based on the score breakdown, as stable
+        message codes (see FEEDBACK_MESSAGES).
         """
         feedback = []
         
         # Keywords feedback
         if scores["keywords"] < 15:
-            feedback.append("Consider adding more relevant industry keywords to your resume.")
+            feedback.append("keywords.low")
         elif scores["keywords"] < 30:
-            feedback.append("Your resume contains some relevant keywords, but could benefit from more specific terminology.")
+            feedback.append("keywords.some")
         else:
-            feedback.append("Good use of relevant keywords throughout your resume.")
+            feedback.append("keywords.good")
         
         # Education feedback
         if scores["education"] < 10:
-            feedback.append("Your education section could be enhanced with more details about degrees and institutions.")
+            feedback.append("education.low")
         else:
-            feedback.append("Your education details are well presented.")
+            feedback.append("education.good")
         
         # Experience feedback
         if scores["experience"] < 10:
-            feedback.append("Add more quantifiable achievements and details to your work experience.")
+            feedback.append("experience.low")
         elif scores["experience"] < 20:
-            feedback.append("Your experience section is solid but could benefit from more specific accomplishments.")
+            feedback.append("experience.some")
         else:
-            feedback.append("Your experience section appears comprehensive and well-detailed.")
+            feedback.append("experience.good")
         
         # Skills feedback
         if scores["skills"] < 10:
-            feedback.append("Consider listing more relevant technical and soft skills.")
+            feedback.append("skills.low")
         elif scores["skills"] < 18:
-            feedback.append("Your skills section is good but could highlight more technical proficiencies.")
+            feedback.append("skills.some")
         else:
-            feedback.append("Excellent range of skills highlighted in your resume.")
+            feedback.append("skills.good")
         
         # Formatting feedback
         if scores["formatting"] < 10:
-            feedback.append("Improve your resume structure with clear section headers and better organization.")
+            feedback.append("formatting.low")
         else:
-            feedback.append("Your resume is well-structured and formatted appropriately.")
+            feedback.append("formatting.good")
         
         return feedback
 
-class BuildResumeAPIView(APIView):
+    def generate_feedback(self, scores):
+        """
+        Generate specific feedback based on the score breakdown.
+        """
+        return [FEEDBACK_MESSAGES[code] for code in self.feedback_codes(scores)]
+
+    def expand_feedback(self, score):
+        # Swap feedback codes for their messages, including the version diff
+        score["feedback"] = [FEEDBACK_MESSAGES[code] for code in score["feedback"]]
+        changes = score.get("changes")
+        if changes:
+            for key in ("feedback_added", "feedback_removed"):
+                changes[key] = [FEEDBACK_MESSAGES[code] for code in changes[key]]
+        return score
+
+class BuildResumeAPIView(AdmissionControlMixin, APIView):
+    admission_scope = "build-resume"
+
     def post(self, request):
         try:
             user_data = request.data.get("info", "")  # e.g., "My name is John. I have 2 years experience in web dev."
             if not user_data:
                 return Response({"error": "No info provided."}, status=400)
 
-            # Gemini API setup
-            API_KEY = "" #Enter key  # Do NOT use in Authorization header
-            API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={API_KEY}"
+            # Gemini API setup (see RESUME_BUILDER_MODEL in settings)
+            model = settings.RESUME_BUILDER_MODEL
+            API_KEY = model["api_key"]  # Do NOT use in Authorization header
+            API_URL = f"{model['url']}?key={API_KEY}"
             
             headers = {
                 "Content-Type": "application/json"
@@ -315,7 +448,7 @@ class BuildResumeAPIView(APIView):
                 ]
             }
 
-            response = requests.post(API_URL, headers=headers, json=payload)
+            response = requests.post(API_URL, headers=headers, json=payload, timeout=model["timeout"])
 
             if response.status_code != 200:
                 return Response({"error": "External model failed.", "details": response.text}, status=500)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'resume.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +84,110 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Rate limit buckets are stored here; point this at a shared backend
+# (e.g. Redis) to enforce limits across all workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+# Admission control for the CPU-heavy endpoints, per worker process.
+# Requests beyond max_concurrent wait up to queue_timeout seconds in a queue
+# of at most max_queue entries, otherwise they get a 503 with Retry-After.
+# The counters at /api/metrics/ (staff users only) cover the worker process
+# that serves the request, not the whole deployment.
+
+RESUME_ADMISSION_CONTROL = {
+    'resume-score': {
+        'max_concurrent': 4,
+        'max_queue': 8,
+        'queue_timeout': 2.0,
+        'retry_after': 2,
+    },
+    'build-resume': {
+        'max_concurrent': 8,
+        'max_queue': 16,
+        'queue_timeout': 5.0,
+        'retry_after': 5,
+    },
+}
+
+# Per-client token bucket: `burst` is the bucket size, i.e. the most requests
+# allowed at once, and it refills at `rate` requests per minute; rate limited
+# requests get a 429 with Retry-After. Clients are counted by API key when the key is listed in
+# `api_keys` (RESUME_API_KEYS, comma-separated), and by IP address otherwise.
+# The IP is REMOTE_ADDR unless `trusted_proxies` is the number of reverse
+# proxies in front of the app, in which case it is read from X-Forwarded-For.
+# Set rate to 0 to disable.
+
+RESUME_RATE_LIMIT = {
+    'rate': 30,
+    'burst': 10,
+    'api_key_header': 'HTTP_X_API_KEY',
+    'api_keys': {key for key in os.environ.get('RESUME_API_KEYS', '').split(',') if key},
+    'trusted_proxies': 0,
+    'cache': 'default',
+}
+
+
+# OCR fallback for scanned PDFs. Pages with no extractable text that contain
+# an image are rendered with pdftoppm and read with tesseract; both binaries
+# must be installed, otherwise such pages are scored as empty. Results are
+# cached per page hash and each document gets `time_budget` seconds of OCR.
+
+RESUME_OCR = {
+    'enabled': True,
+    'pdftoppm_cmd': 'pdftoppm',
+    'tesseract_cmd': 'tesseract',
+    'language': 'eng',
+    'max_workers': 4,
+    'time_budget': 10.0,
+    'target_pixels': 3300,
+    'min_dpi': 150,
+    'max_dpi': 400,
+    'cache': 'default',
+    'cache_timeout': 24 * 60 * 60,
+}
+
+
+# Incremental re-scoring. Per-section hits and the sections of each scored
+# version are kept in this cache so a resubmitted resume only re-matches the
+# sections that changed and can be diffed against `previous_version`.
+
+RESUME_INCREMENTAL = {
+    'cache': 'default',
+    'timeout': 24 * 60 * 60,
+}
+
+
+# Upstream model used by the build-resume endpoint. Point the URL at a local
+# stand-in (python -m loadtest.fake_model) for load testing.
+
+RESUME_BUILDER_MODEL = {
+    'url': os.environ.get(
+        'RESUME_BUILDER_MODEL_URL',
+        'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent',
+    ),
+    'api_key': os.environ.get('GEMINI_API_KEY', ''),
+    'timeout': 60,
+}
+
+
+# Response compression for large API payloads. zstd is used when the client
+# accepts it and the zstandard package is installed, gzip otherwise.
+
+RESUME_COMPRESSION = {
+    'path_prefix': '/api/',
+    'min_size': 1024,
+    'zstd_level': 3,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 